@@ -1,2 +1,17 @@
-import blockchain.simple_blockchain
-import blockchain.structures
\ No newline at end of file
+"""Simple blockchain package, submodules are imported on first access."""
+import importlib
+
+
+__all__ = [
+    "block_sizing",
+    "node",
+    "profiling",
+    "simple_blockchain",
+    "structures",
+]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,180 @@
+"""Adaptive block sizing policy for SimpleBlockchain."""
+import collections
+import math
+import typing
+
+
+class SizingDecision(typing.NamedTuple):
+    """Structure to store a single block sizing decision."""
+    blockSize: int
+    queueDepth: int
+    reason: str
+    fixedCostNs: typing.Optional[float] = None
+    perTransactionCostNs: typing.Optional[float] = None
+
+
+class AdaptiveBlockSizer(object):
+    """Class choosing the size of the next block from measured costs.
+
+    The cost of sealing a block of n transactions is modelled as
+    fixed + n * per_transaction, where fixed covers make_block hashing and
+    the chain append and per_transaction covers validation and state update.
+    Both are measured as exponentially weighted moving averages.
+    """
+
+    def __init__(
+            self,
+            initial_block_size: int = 5,
+            min_block_size: int = 1,
+            max_block_size: int = 1000,
+            target_block_latency: typing.Optional[float] = 0.05,
+            target_throughput: typing.Optional[float] = None,
+            max_block_age: typing.Optional[float] = None,
+            smoothing: float = 0.2,
+            history: int = 1000
+            ) -> None:
+        """Create a new block sizing policy.
+
+        Args:
+            initial_block_size: Block size used before any measurement.
+            min_block_size: Lower bound of the block size.
+            max_block_size: Upper bound of the block size.
+            target_block_latency: Seconds a single block may take to be
+                filled and sealed, None for no limit.
+            target_throughput: Desired transactions per second, None for no
+                target.
+            max_block_age: Seal a block once its oldest transaction has
+                waited this many seconds since arrival, even if the block is
+                not full. None to seal on size only.
+            smoothing: Weight of the newest measurement in the averages.
+            history: Number of the latest decisions kept for reporting.
+        Raises:
+            ValueError: If the bounds or smoothing are inconsistent.
+        """
+        if not 1 <= min_block_size <= max_block_size:
+            raise ValueError(
+                "Block size bounds must satisfy 1 <= min <= max")
+        if not 0 < smoothing <= 1:
+            raise ValueError("smoothing has to be in the (0, 1] interval")
+        self.min_block_size: int = min_block_size
+        self.max_block_size: int = max_block_size
+        self.block_size: int = self._clamp(initial_block_size)
+        self.target_block_latency = target_block_latency
+        self.target_throughput = target_throughput
+        self.max_block_age = max_block_age
+        self.smoothing: float = smoothing
+        self.fixed_cost_ns: typing.Optional[float] = None
+        self.per_transaction_cost_ns: typing.Optional[float] = None
+        self.decisions: collections.deque[SizingDecision] =\
+            collections.deque(maxlen=history)
+
+    def _clamp(self, size: int) -> int:
+        """Clamp the size into the configured bounds."""
+        return max(self.min_block_size, min(self.max_block_size, size))
+
+    def _smooth(
+            self,
+            average: typing.Optional[float],
+            value: float) -> float:
+        """Update an exponentially weighted moving average."""
+        if average is None:
+            return value
+        return average + self.smoothing * (value - average)
+
+    def next_block_size(self, queue_depth: int) -> int:
+        """Choose the size of the next block.
+
+        Args:
+            queue_depth: Number of transactions waiting to be processed.
+        Returns:
+            The number of transactions the next block should hold.
+        """
+        size = self.block_size
+        reason = "steady"
+        if queue_depth >= 2 * size:
+            size *= 2
+            reason = "queue backlog"
+        elif queue_depth < size:
+            size = max(queue_depth, (size + 1) // 2)
+            reason = "queue draining"
+
+        fixed = self.fixed_cost_ns
+        per_tx = self.per_transaction_cost_ns
+        if fixed is not None and per_tx is not None:
+            if self.target_throughput:
+                # n / (fixed + n * per_tx) >= throughput
+                spare = 1e9 - per_tx * self.target_throughput
+                if spare > 0:
+                    floor = math.ceil(fixed * self.target_throughput / spare)
+                    if size < floor:
+                        size = floor
+                        reason = "throughput target"
+            if self.target_block_latency and per_tx > 0:
+                # fixed + n * per_tx <= latency
+                cap = int((self.target_block_latency * 1e9 - fixed) / per_tx)
+                if size > cap:
+                    size = cap
+                    reason = "latency target"
+
+        self.block_size = self._clamp(size)
+        self.decisions.append(SizingDecision(
+            blockSize=self.block_size,
+            queueDepth=queue_depth,
+            reason=reason,
+            fixedCostNs=fixed,
+            perTransactionCostNs=per_tx
+            ))
+        return self.block_size
+
+    def seal_deadline(self, oldest_arrival: float) -> typing.Optional[float]:
+        """Compute when a block has to be sealed at the latest.
+
+        Args:
+            oldest_arrival: time.monotonic() when the oldest transaction
+                waiting for the block arrived.
+        Returns:
+            time.monotonic() value of the deadline, None without max_block_age.
+        """
+        if self.max_block_age is None:
+            return None
+        return oldest_arrival + self.max_block_age
+
+    def record_block(
+            self,
+            transactions_count: int,
+            validation_ns: int,
+            seal_ns: int) -> None:
+        """Feed the measured costs of a processed block into the policy.
+
+        Args:
+            transactions_count: Number of transactions examined for the block.
+            validation_ns: Time spent validating and applying transactions.
+            seal_ns: Time spent in make_block and appending to the chain.
+        """
+        self.fixed_cost_ns = self._smooth(self.fixed_cost_ns, seal_ns)
+        if transactions_count > 0:
+            self.per_transaction_cost_ns = self._smooth(
+                self.per_transaction_cost_ns,
+                validation_ns / transactions_count
+                )
+
+    def report(self) -> str:
+        """Summarize the kept decisions.
+
+        Returns:
+            Human readable summary of the policy state and decisions.
+        """
+        reasons = collections.Counter(dec.reason for dec in self.decisions)
+        sizes = [dec.blockSize for dec in self.decisions]
+        lines = [
+            f"Current block size: {self.block_size}",
+            f"Fixed block cost: {self.fixed_cost_ns} ns",
+            f"Per transaction cost: {self.per_transaction_cost_ns} ns",
+            ]
+        if sizes:
+            lines.append(
+                f"Block sizes over {len(sizes)} decisions: min {min(sizes)}, "
+                f"mean {sum(sizes) / len(sizes):.1f}, max {max(sizes)}")
+        lines.extend(
+            f"  {reason}: {count}" for reason, count in reasons.most_common())
+        return "\n".join(lines)
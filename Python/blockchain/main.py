@@ -1,13 +1,175 @@
 """File defining the entrypoint to this blockchain module."""
-import json
-import blockchain.simple_blockchain
-import blockchain.structures as struct
+import argparse
+import typing
 
+# Submodules are imported in the functions using them to keep startup fast.
 
-def main():
-    my_blockchain = blockchain.simple_blockchain.SimpleBlockchain()
+
+def parse_args(argv: typing.Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse the command line arguments.
+
+    Args:
+        argv: Arguments to be parsed, sys.argv is used if None.
+    Returns:
+        Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        default=None,
+        help="Profile the run and write collapsed stacks into PATH.")
+    parser.add_argument(
+        "--profile-sample-every",
+        type=int,
+        default=20,
+        help="Measure only every n-th call of each call stack, 1 measures "
+        "every call at a considerable overhead.")
+    parser.add_argument(
+        "--profile-allocations",
+        action="store_true",
+        help="Also measure allocated memory (slower).")
+    parser.add_argument(
+        "--adaptive-blocks",
+        action="store_true",
+        help="Size blocks adaptively and report the sizing decisions.")
+    parser.add_argument(
+        "--target-block-latency",
+        type=float,
+        default=0.05,
+        help="Seconds an adaptive block may take to be filled and sealed, "
+        "0 for no limit.")
+    parser.add_argument(
+        "--target-throughput",
+        type=float,
+        default=None,
+        help="Transactions per second the adaptive block size should reach.")
+    parser.add_argument(
+        "--max-block-age",
+        type=float,
+        default=None,
+        help="Seal an adaptive block once its oldest transaction has waited "
+        "this many seconds, only with --node.")
+    parser.add_argument(
+        "--node",
+        metavar="SOURCE",
+        default=None,
+        help="Run a streaming node reading JSON line transactions from "
+        "SOURCE: a file path, - for stdin, unix:PATH or tcp:PORT.")
+    parser.add_argument(
+        "--data-dir",
+        default="node_data",
+        help="Directory where the node persists chain and state.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Maximum number of transactions processed at once.")
+    parser.add_argument(
+        "--batch-timeout",
+        type=float,
+        default=0.5,
+        help="Seconds to wait for a batch to fill up.")
+    parser.add_argument(
+        "--persist-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between persisting chain and state.")
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=10000,
+        help="Transactions buffered before the reader is throttled.")
+    args = parser.parse_args(argv)
+    if args.max_block_age is not None and not args.node:
+        parser.error("--max-block-age applies only to a node, use --node")
+    return args
+
+
+def make_block_sizer(args: argparse.Namespace) -> typing.Any:
+    """Create the adaptive block sizer requested on the command line.
+
+    Args:
+        args: Parsed command line arguments.
+    Returns:
+        AdaptiveBlockSizer or None if adaptive blocks are disabled.
+    """
+    if not args.adaptive_blocks:
+        return None
+    import blockchain.block_sizing
+    return blockchain.block_sizing.AdaptiveBlockSizer(
+        target_block_latency=args.target_block_latency or None,
+        target_throughput=args.target_throughput,
+        max_block_age=args.max_block_age
+        )
+
+
+def run_node(args: argparse.Namespace) -> None:
+    """Run the streaming node until its source ends or it is stopped.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    import blockchain.node
+    import blockchain.simple_blockchain
+
+    profiler = None
+    if args.profile:
+        import blockchain.profiling
+        profiler = blockchain.profiling.Profiler(
+            sample_every=args.profile_sample_every,
+            trace_allocations=args.profile_allocations
+            )
+    block_sizer = make_block_sizer(args)
+    node = blockchain.node.StreamingNode(
+        args.node,
+        args.data_dir,
+        batch_size=args.batch_size,
+        batch_timeout=args.batch_timeout,
+        persist_interval=args.persist_interval,
+        queue_size=args.queue_size,
+        block_sizer=block_sizer,
+        blockchain=blockchain.simple_blockchain.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        )
+    node.install_signal_handlers()
+    try:
+        node.run()
+    finally:
+        if block_sizer is not None:
+            print(block_sizer.report())
+        if profiler is not None:
+            profiler.stop()
+            profiler.write_collapsed_stacks(args.profile)
+            print(profiler.summary())
+
+
+def run_demo(args: argparse.Namespace) -> None:
+    """Run the fixed demonstration of the blockchain.
+
+    Args:
+        args: Parsed command line arguments.
+    """
+    import blockchain.simple_blockchain
+
+    profiler = None
+    if args.profile:
+        import blockchain.profiling
+        profiler = blockchain.profiling.Profiler(
+            sample_every=args.profile_sample_every,
+            trace_allocations=args.profile_allocations
+            )
+
+    my_blockchain = blockchain.simple_blockchain.SimpleBlockchain(
+        profiler=profiler)
+    block_sizer = make_block_sizer(args)
     transactions = my_blockchain.make_transactions_buffer()
-    my_blockchain.process_transactions_buffer(transactions)
+    my_blockchain.process_transactions_buffer(
+        transactions,
+        block_sizer=block_sizer
+        )
     transactions = my_blockchain.make_transactions_buffer(5)
     incoming_chain = [my_blockchain.make_block(transactions)]
     my_blockchain.update_chain(incoming_chain)
@@ -15,6 +177,21 @@ def main():
     chain_copy = my_blockchain.load_exported_chain(chainson)
     print(chain_copy == my_blockchain.chain)
 
+    if block_sizer is not None:
+        print(block_sizer.report())
+    if profiler is not None:
+        profiler.stop()
+        profiler.write_collapsed_stacks(args.profile)
+        print(profiler.summary())
+
+
+def main(argv: typing.Optional[list[str]] = None):
+    args = parse_args(argv)
+    if args.node:
+        run_node(args)
+    else:
+        run_demo(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,547 @@
+"""Long running node streaming transactions into a SimpleBlockchain."""
+import json
+import os
+import queue
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import typing
+
+import blockchain.block_sizing as my_sizing
+import blockchain.simple_blockchain as my_blc
+
+
+# Marks the end of the input stream in the transactions queue.
+_END_OF_STREAM = None
+
+
+class StreamingNode(object):
+    """Class feeding streamed transactions into the blockchain in batches.
+
+    Transactions are read as JSON lines, one dict per line, from a file,
+    standard input ("-") or a local socket ("unix:PATH" or "tcp:PORT").
+    A bounded queue between the reader thread and the processing loop
+    provides backpressure: the reader blocks once the queue is full.
+    New blocks are appended to chain.jsonl in the data directory and the
+    state is snapshotted into state.json together with the last block
+    and, for file sources, the byte offset of the input already processed.
+    A restarted node loads the snapshot instead of re-validating the chain
+    and continues reading a file source after that offset.
+    """
+
+    def __init__(
+            self,
+            source: str,
+            data_dir: str,
+            batch_size: int = 100,
+            batch_timeout: float = 0.5,
+            persist_interval: float = 5.0,
+            queue_size: int = 10000,
+            drain_timeout: float = 5.0,
+            block_sizer: typing.Optional[my_sizing.AdaptiveBlockSizer] = None,
+            blockchain: typing.Optional[my_blc.SimpleBlockchain] = None
+            ) -> None:
+        """Create a new streaming node.
+
+        Args:
+            source: "-", a file path, "unix:PATH" or "tcp:PORT".
+            data_dir: Directory for the chain log and the state snapshot.
+            batch_size: Maximum number of transactions processed at once.
+            batch_timeout: Seconds to wait for a batch to fill up.
+            persist_interval: Seconds between writes to the data directory.
+            queue_size: Capacity of the queue between reader and processing.
+            drain_timeout: Seconds a stopped node keeps taking in what its
+                reader has already read.
+            block_sizer: Optional adaptive block sizing policy.
+            blockchain: Blockchain to be extended, a new one if None.
+        """
+        self.source: str = source
+        self.data_dir: str = data_dir
+        self.chain_path: str = os.path.join(data_dir, "chain.jsonl")
+        self.state_path: str = os.path.join(data_dir, "state.json")
+        self.batch_size: int = batch_size
+        self.batch_timeout: float = batch_timeout
+        self.persist_interval: float = persist_interval
+        self.block_sizer = block_sizer
+        self.blockchain: my_blc.SimpleBlockchain = blockchain\
+            if blockchain is not None\
+            else my_blc.SimpleBlockchain(state={"Alice": 50, "Bob": 50})
+        self.transactions: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stop_event: threading.Event = threading.Event()
+        self.drain_timeout: float = drain_timeout
+        self.accepted: int = 0
+        self.rejects: int = 0
+        # Transactions read from the source but lost during the shutdown.
+        self.dropped: int = 0
+        self.reader_error: typing.Optional[Exception] = None
+        self._drain_deadline: float = 0.0
+        self._queue_lock: threading.Lock = threading.Lock()
+        self._queue_closed: bool = False
+        # Byte offset of a file source up to which transactions are applied.
+        self.source_offset: typing.Optional[int] = 0\
+            if self.is_file_source() else None
+        self._restored: bool = False
+        self._persisted_blocks: int = 0
+        self._reader: typing.Optional[threading.Thread] = None
+
+    def is_file_source(self) -> bool:
+        """Check whether the source is a file which can be read again."""
+        return self.source != "-"\
+            and not self.source.startswith(("unix:", "tcp:"))
+
+    def _read_chain_log(self) -> tuple[list, list[int]]:
+        """Read the chain log, cutting off a torn last line.
+
+        Returns:
+            Tuple with the blocks[0] and byte offsets of their line ends[1].
+        Raises:
+            ValueError: If a line other than the last one is corrupted.
+        """
+        blocks = []
+        line_ends: list[int] = []
+        with open(self.chain_path, "rb") as chain_file:
+            lines = chain_file.readlines()
+        offset = 0
+        for nr, line in enumerate(lines):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("line is not terminated")
+                block = self.blockchain.load_block(json.loads(line))
+            except Exception as exception:
+                if nr != len(lines) - 1:
+                    raise ValueError(
+                        f"Corrupted line {nr + 1} in {self.chain_path}: "
+                        f"{exception}")
+                # Only an interrupted append can leave this behind.
+                print(f"Dropping torn last line of {self.chain_path}")
+                self._truncate_chain_log(offset)
+                break
+            offset += len(line)
+            blocks.append(block)
+            line_ends.append(offset)
+        return blocks, line_ends
+
+    def _truncate_chain_log(self, size: int) -> None:
+        """Cut the chain log to the given size in bytes."""
+        with open(self.chain_path, "r+b") as chain_file:
+            chain_file.truncate(size)
+            os.fsync(chain_file.fileno())
+
+    def _read_snapshot(self) -> typing.Optional[dict]:
+        """Read the state snapshot, None if there is no usable one."""
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except ValueError as exception:
+            print(f"Ignoring unreadable snapshot: {exception}")
+            return None
+
+    def restore(self) -> bool:
+        """Restore the chain and state persisted in the data directory.
+
+        The snapshot is trusted when its hash matches the block of the same
+        number in the chain log. Blocks logged after the snapshot are dropped
+        for file sources, whose input is read again from the snapshot
+        offset, and validated on top of the snapshot state otherwise.
+
+        Returns:
+            True if a persisted chain has been restored, False if there is
+            nothing to restore.
+        Raises:
+            ValueError: If the persisted chain or snapshot is inconsistent.
+        """
+        self._restored = True
+        if not os.path.exists(self.chain_path):
+            return False
+        blocks, line_ends = self._read_chain_log()
+        if not blocks:
+            return False
+
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            if self.is_file_source():
+                # Nothing has been committed, start over from the genesis.
+                blocks = blocks[:1]
+                self._truncate_chain_log(line_ends[0])
+            if not self.blockchain.import_chain(blocks):
+                raise ValueError(
+                    f"Persisted chain {self.chain_path} is invalid")
+            self._persisted_blocks = len(self.blockchain.chain)
+            return True
+
+        block_nr = snapshot["blockNumber"]
+        if block_nr >= len(blocks) or blocks[block_nr].hash != snapshot["hash"]:
+            raise ValueError(
+                f"Snapshot {self.state_path} doesn't match {self.chain_path}")
+        tail = blocks[block_nr + 1:]
+        if tail and self.is_file_source():
+            print(f"Dropping {len(tail)} blocks logged after the snapshot.")
+            self._truncate_chain_log(line_ends[block_nr])
+            tail = []
+
+        self.blockchain.chain = blocks[:block_nr + 1]
+        self.blockchain.state = dict(snapshot["state"])
+        for block in tail:
+            self.blockchain.check_block_validity(
+                block,
+                self.blockchain.chain[-1])
+            self.blockchain.chain.append(block)
+        if self.is_file_source():
+            self.source_offset = snapshot.get("sourceOffset") or 0
+        self._persisted_blocks = len(self.blockchain.chain)
+        return True
+
+    def persist(self) -> None:
+        """Append the new blocks to the chain log and snapshot the state.
+
+        Raises:
+            ValueError: If the chain log has data which was not restored.
+        """
+        new_blocks = self.blockchain.chain[self._persisted_blocks:]
+        if not new_blocks and os.path.exists(self.state_path):
+            return
+        if self._persisted_blocks == 0 and os.path.exists(self.chain_path)\
+                and os.path.getsize(self.chain_path) > 0:
+            raise ValueError(
+                f"{self.chain_path} already exists, call restore() first")
+        with self.blockchain.phase("persist"):
+            self._write_persisted(new_blocks)
+
+    def _write_persisted(self, new_blocks: list) -> None:
+        """Append the blocks to the chain log and replace the snapshot."""
+        last_block = self.blockchain.chain[-1]
+        with self.blockchain.phase("serialize"):
+            blocks_text = "".join(f"{block!r}\n" for block in new_blocks)
+            snapshot_text = json.dumps({
+                "blockNumber": last_block.blockContents.blockNumber,
+                "hash": last_block.hash,
+                "state": self.blockchain.state,
+                "sourceOffset": self.source_offset
+            }, sort_keys=True)
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(self.chain_path, "a", encoding="utf-8") as chain_file:
+            chain_file.write(blocks_text)
+            chain_file.flush()
+            os.fsync(chain_file.fileno())
+        self._persisted_blocks = len(self.blockchain.chain)
+
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            state_file.write(snapshot_text)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    def _put(self, item: typing.Any) -> bool:
+        """Put an item into the queue, waiting while the queue is full.
+
+        Once a stop has been requested the wait is bounded by the drain
+        timeout, and nothing is accepted after run() has closed the queue.
+
+        Returns:
+            True if the item has been queued.
+        """
+        while True:
+            with self._queue_lock:
+                if self._queue_closed:
+                    return False
+                try:
+                    self.transactions.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            if self.stop_event.is_set()\
+                    and time.monotonic() >= self._drain_deadline:
+                return False
+            # Blocks while the queue is full, which throttles the producer.
+            time.sleep(0.005)
+
+    def _enqueue_line(
+            self,
+            line: bytes,
+            end_offset: typing.Optional[int] = None) -> None:
+        """Parse a JSON line and put the transaction into the queue.
+
+        Args:
+            line: Raw line read from the source.
+            end_offset: Source offset of the end of the line, if known.
+        """
+        line = line.strip()
+        if not line:
+            return
+        try:
+            transaction = json.loads(line.decode("utf-8"))
+            assert(isinstance(transaction, dict))
+        except Exception as exception:
+            print(f"Malformed transaction skipped: {exception!r}")
+            return
+        queued = self._put((transaction, end_offset, time.monotonic()))
+        # Lines of a file source are read again after a restart.
+        if not queued and end_offset is None:
+            self._count_dropped(1)
+
+    def _count_dropped(self, count: int) -> None:
+        """Count transactions lost during the shutdown."""
+        with self._queue_lock:
+            self.dropped += count
+
+    def _pump(
+            self,
+            read: typing.Callable[[], typing.Optional[bytes]],
+            name: str) -> None:
+        """Split a byte stream into lines and enqueue them.
+
+        Reading stops on the end of the stream, an error or a stop request.
+        Complete lines already read are enqueued in every case.
+
+        Args:
+            read: Returns the next chunk, b"" at the end of the stream or
+                None if nothing has arrived within its timeout.
+            name: Description of the stream for the log.
+        """
+        pending = b""
+        ended = False
+        while not self.stop_event.is_set():
+            try:
+                chunk = read()
+            except OSError as exception:
+                print(f"Reading {name} failed: {exception!r}")
+                break
+            if chunk is None:
+                continue
+            if not chunk:
+                ended = True
+                break
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                self._enqueue_line(line)
+        if ended:
+            self._enqueue_line(pending)
+        elif pending.strip():
+            print(f"Dropping an incomplete line from {name}.")
+            self._count_dropped(1)
+
+    def _serve_connection(self, connection: socket.socket, name: str) -> None:
+        """Read transactions from a single accepted connection."""
+        connection.settimeout(0.2)
+
+        def read() -> typing.Optional[bytes]:
+            try:
+                return connection.recv(65536)
+            except socket.timeout:
+                return None
+
+        try:
+            with connection:
+                self._pump(read, name)
+        except Exception as exception:
+            print(f"Connection {name} failed: {exception!r}")
+
+    def _serve_socket(self) -> None:
+        """Accept local connections and serve each one on its own thread."""
+        if self.source.startswith("unix:"):
+            path = self.source[len("unix:"):]
+            if os.path.exists(path):
+                os.unlink(path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(path)
+        else:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(("127.0.0.1", int(self.source[len("tcp:"):])))
+        server.listen()
+        server.settimeout(0.2)
+        handlers: list[threading.Thread] = []
+        with server:
+            while not self.stop_event.is_set():
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                except OSError as exception:
+                    print(f"Accepting a connection failed: {exception!r}")
+                    continue
+                handler = threading.Thread(
+                    target=self._serve_connection,
+                    args=(connection, f"connection {len(handlers) + 1}"),
+                    daemon=True)
+                handler.start()
+                handlers.append(handler)
+        # Let the connections enqueue what they have already read.
+        for handler in handlers:
+            handler.join()
+
+    def _read_stdin(self) -> None:
+        """Read transactions from the standard input."""
+        stream = sys.stdin.buffer
+        try:
+            fd = stream.fileno()
+            select.select([fd], [], [], 0)
+        except (OSError, ValueError):
+            # Not a selectable pipe, stop requests are noticed between lines.
+            self._pump(lambda: stream.readline(), "stdin")
+            return
+
+        def read() -> typing.Optional[bytes]:
+            ready, _, _ = select.select([fd], [], [], 0.2)
+            return os.read(fd, 65536) if ready else None
+
+        self._pump(read, "stdin")
+
+    def _read_file(self) -> None:
+        """Read transactions of a file source after the processed offset."""
+        offset = self.source_offset or 0
+        with open(self.source, "rb") as source_file:
+            source_file.seek(offset)
+            for line in source_file:
+                # The file can be read again, unread lines are not lost.
+                if self.stop_event.is_set():
+                    return
+                offset += len(line)
+                self._enqueue_line(line, offset)
+
+    def _read_source(self) -> None:
+        """Read the configured source until its end or a stop request."""
+        try:
+            if self.source.startswith(("unix:", "tcp:")):
+                self._serve_socket()
+            elif self.source == "-":
+                self._read_stdin()
+            else:
+                self._read_file()
+        except Exception as exception:
+            print(f"Reading transactions failed: {exception!r}")
+            self.reader_error = exception
+        finally:
+            self._put(_END_OF_STREAM)
+
+    def _next_batch(self) -> tuple[list[tuple], bool]:
+        """Collect the next batch of transactions.
+
+        The batch is cut short once the oldest transaction in it reaches
+        the max_block_age of the block sizer, so that waiting for a full
+        batch doesn't delay it under light load. After a stop request the
+        batch is returned as soon as the queue runs empty, and the stream
+        is treated as ended once the drain timeout passes.
+
+        Returns:
+            Tuple with the batch of (transaction, offset, arrival) items[0]
+            and flag whether the stream ended[1].
+        """
+        batch: list[tuple] = []
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            now = time.monotonic()
+            if self.stop_event.is_set():
+                if now >= self._drain_deadline:
+                    return batch, True
+                timeout = min(0.1, self._drain_deadline - now)
+            else:
+                timeout = max(deadline - now, 0)
+            try:
+                item = self.transactions.get(timeout=timeout)
+            except queue.Empty:
+                if self.stop_event.is_set() or now >= deadline:
+                    return batch, False
+                continue
+            if item is _END_OF_STREAM:
+                return batch, True
+            batch.append(item)
+            if len(batch) == 1 and self.block_sizer is not None:
+                seal_deadline = self.block_sizer.seal_deadline(item[2])
+                if seal_deadline is not None:
+                    deadline = min(deadline, seal_deadline)
+        return batch, False
+
+    def _process_batch(self, batch: list[tuple]) -> None:
+        """Apply a batch of queued transactions to the blockchain."""
+        # process_transactions_buffer pops from the end.
+        buffer = [item[0] for item in reversed(batch)]
+        accepted, rejects = self.blockchain.process_transactions_buffer(
+            buffer,
+            block_sizer=self.block_sizer,
+            pending_transactions=self.transactions.qsize()
+            )
+        self.accepted += accepted
+        self.rejects += rejects
+        if batch[-1][1] is not None:
+            self.source_offset = batch[-1][1]
+
+    def _close_queue(self) -> list[tuple]:
+        """Stop accepting transactions and take what is left in the queue."""
+        with self._queue_lock:
+            self._queue_closed = True
+        leftover = []
+        while True:
+            try:
+                item = self.transactions.get_nowait()
+            except queue.Empty:
+                return leftover
+            if item is not _END_OF_STREAM:
+                leftover.append(item)
+
+    def stop(self, *_) -> None:
+        """Request a graceful shutdown, usable as a signal handler.
+
+        No new input is read, but transactions already read are still
+        processed for up to drain_timeout seconds.
+        """
+        if not self.stop_event.is_set():
+            self._drain_deadline = time.monotonic() + self.drain_timeout
+            self.stop_event.set()
+
+    def run(self) -> tuple:
+        """Process the stream until it ends or the node is stopped.
+
+        The persisted chain is restored first unless restore() has already
+        been called. Blocks are persisted on a clean stop, but not when
+        processing fails.
+
+        Returns:
+            Tuple with numbers of accepted[0] and rejected[1] transactions.
+        Raises:
+            RuntimeError: If the source could not be read.
+        """
+        if not self._restored and self.restore():
+            print(f"Restored chain of size {len(self.blockchain.chain)}")
+        self._reader = threading.Thread(target=self._read_source, daemon=True)
+        self._reader.start()
+        last_persist = time.monotonic()
+        finished = False
+        try:
+            while not finished:
+                batch, finished = self._next_batch()
+                if batch:
+                    self._process_batch(batch)
+                if time.monotonic() - last_persist >= self.persist_interval:
+                    self.persist()
+                    last_persist = time.monotonic()
+            self.stop()
+            leftover = self._close_queue()
+            if leftover:
+                self._process_batch(leftover)
+        except BaseException:
+            # A half applied batch must not be persisted with a stale offset.
+            self.stop()
+            self._close_queue()
+            raise
+        self.persist()
+        print(
+            f"Node stopped with {self.accepted} accepted, {self.rejects} "
+            f"rejected and {self.dropped} dropped transactions.")
+        if self.reader_error is not None:
+            raise RuntimeError(
+                f"Reading {self.source} failed: {self.reader_error!r}"
+                ) from self.reader_error
+        return (self.accepted, self.rejects)
+
+    def install_signal_handlers(self) -> None:
+        """Stop gracefully on SIGINT and SIGTERM."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
@@ -0,0 +1,318 @@
+"""Lightweight per-method profiler for SimpleBlockchain instances."""
+import contextlib
+import dataclasses
+import functools
+import time
+import tracemalloc
+import typing
+
+
+# Methods of SimpleBlockchain which are wrapped by default.
+DEFAULT_METHODS: tuple[str, ...] = (
+    "_make_genesis_block",
+    "make_block",
+    "hash_msg",
+    "make_random_transaction",
+    "update_state",
+    "is_valid_transaction",
+    "make_transactions_buffer",
+    "process_transactions_buffer",
+    "check_block_hash",
+    "check_block_validity",
+    "export_chain",
+    "load_exported_chain",
+    "import_chain",
+    "update_chain",
+)
+
+
+@dataclasses.dataclass
+class MethodStats():
+    """Structure to store aggregated estimates of a single method or phase.
+
+    Note: Times and allocations are estimated for all calls and are
+        inclusive of the nested profiled calls.
+    """
+    calls: int = 0
+    sampled_calls: int = 0
+    wall_ns: float = 0
+    cpu_ns: float = 0
+    alloc_bytes: float = 0
+
+
+@dataclasses.dataclass
+class StackStats():
+    """Structure to store the measurements of a single call stack.
+
+    Note: Times and allocations cover only the sampled calls, use scale()
+        to estimate the totals.
+    """
+    key: str = ""
+    calls: int = 0
+    sampled_calls: int = 0
+    wall_ns: int = 0
+    self_wall_ns: int = 0
+    cpu_ns: int = 0
+    alloc_bytes: int = 0
+    children: dict[str, "StackStats"] = dataclasses.field(
+        default_factory=dict,
+        repr=False)
+
+    def scale(self) -> float:
+        """Ratio of all calls to the sampled calls."""
+        return self.calls / self.sampled_calls if self.sampled_calls else 0.0
+
+
+@dataclasses.dataclass(slots=True)
+class _Frame():
+    """Structure to store an open measured call."""
+    stats: StackStats
+    child_wall_ns: float = 0
+    peak_memory: int = 0
+    start_memory: int = 0
+    start_wall_ns: int = 0
+    start_cpu_ns: int = 0
+
+
+class Profiler(object):
+    """Class attributing wall time, CPU time and allocations to methods.
+
+    The profiler wraps methods of an object instance, so only the profiled
+    instance pays the instrumentation overhead, and phase() marks parts of
+    a method. Every call is counted per call stack, but only every n-th
+    call of each stack is measured and its measurements are scaled by the
+    ratio of counted to measured calls of that stack. Results can be
+    written as collapsed stacks (flamegraph.pl / speedscope input) and as
+    a summary table.
+    """
+
+    def __init__(
+            self,
+            sample_every: int = 20,
+            trace_allocations: bool = False
+            ) -> None:
+        """Create a new profiler.
+
+        Args:
+            sample_every: Measure only every n-th call of each call stack,
+                the other calls only bump a counter.
+            trace_allocations: Measure the peak memory allocated during
+                a call using tracemalloc. This is considerably more expensive
+                than timing alone.
+        Raises:
+            ValueError: If sample_every is lower than 1.
+        """
+        if sample_every < 1:
+            raise ValueError("sample_every has to be a positive integer")
+        self.sample_every: int = sample_every
+        self.trace_allocations: bool = trace_allocations
+        self.stacks: dict[str, StackStats] = {}
+        # Path of the open calls and the measured calls among them.
+        self._root: StackStats = StackStats()
+        self._stack: list[StackStats] = []
+        self._frames: list[_Frame] = []
+        self._started_tracing: bool = False
+
+    def instrument(
+            self,
+            obj: typing.Any,
+            methods: typing.Iterable[str] = DEFAULT_METHODS) -> None:
+        """Wrap the given methods of an object instance.
+
+        Args:
+            obj: Instance whose methods should be profiled.
+            methods: Names of the methods to be wrapped.
+        """
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        for name in methods:
+            setattr(obj, name, self.wrap(getattr(obj, name), name))
+
+    def stop(self) -> None:
+        """Stop allocation tracing if this profiler has started it.
+
+        The wrapped methods keep counting calls and timing, but allocations
+        are no longer measured.
+        """
+        self.trace_allocations = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def wrap(self, func: typing.Callable, name: str) -> typing.Callable:
+        """Wrap a single callable so that its calls are recorded.
+
+        Args:
+            func: The callable to be wrapped.
+            name: The name under which the calls are recorded.
+        Returns:
+            Wrapped callable.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Fast path of _enter for the unmeasured calls of a known stack.
+            stack = self._stack
+            stats = (stack[-1] if stack else self._root).children.get(name)
+            if stats is not None and stats.calls % self.sample_every:
+                stats.calls += 1
+                stack.append(stats)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    stack.pop()
+            frame = self._enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._exit(frame)
+        return wrapper
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """Record the enclosed code as a nested frame of the current call.
+
+        Args:
+            name: The name under which the phase is recorded.
+        """
+        frame = self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(frame)
+
+    def _enter(self, name: str) -> typing.Optional[_Frame]:
+        """Push a call and start measuring it if it is sampled.
+
+        Returns:
+            The measured frame, None if the call is not sampled.
+        """
+        parent = self._stack[-1] if self._stack else self._root
+        stats = parent.children.get(name)
+        if stats is None:
+            key = f"{parent.key};{name}" if self._stack else name
+            stats = self.stacks.get(key)
+            if stats is None:
+                stats = self.stacks[key] = StackStats(key)
+            parent.children[name] = stats
+        stats.calls += 1
+        # Unmeasured calls stay on the path so callees get a full stack.
+        self._stack.append(stats)
+        if (stats.calls - 1) % self.sample_every:
+            return None
+
+        frame = _Frame(stats)
+        if self.trace_allocations and tracemalloc.is_tracing():
+            frame.start_memory, peak = tracemalloc.get_traced_memory()
+            frame.peak_memory = frame.start_memory
+            # The peak is reset below, hand it over to the enclosing call.
+            if self._frames:
+                self._frames[-1].peak_memory = max(
+                    self._frames[-1].peak_memory,
+                    peak)
+            tracemalloc.reset_peak()
+        self._frames.append(frame)
+        frame.start_wall_ns = time.perf_counter_ns()
+        frame.start_cpu_ns = time.thread_time_ns()
+        return frame
+
+    def _exit(self, frame: typing.Optional[_Frame]) -> None:
+        """Pop the call and record its measurements if it is sampled."""
+        if frame is None:
+            self._stack.pop()
+            return
+        cpu = time.thread_time_ns() - frame.start_cpu_ns
+        wall = time.perf_counter_ns() - frame.start_wall_ns
+        alloc = 0
+        if self.trace_allocations and tracemalloc.is_tracing():
+            frame.peak_memory = max(
+                frame.peak_memory,
+                tracemalloc.get_traced_memory()[1])
+            alloc = frame.peak_memory - frame.start_memory
+        self._stack.pop()
+        self._frames.pop()
+
+        stats = frame.stats
+        stats.sampled_calls += 1
+        stats.wall_ns += wall
+        stats.cpu_ns += cpu
+        stats.alloc_bytes += alloc
+        stats.self_wall_ns += max(wall - frame.child_wall_ns, 0)
+        if self._frames:
+            parent = self._frames[-1]
+            if self._stack and parent.stats is self._stack[-1]:
+                # Only some calls of this stack are measured, estimate all.
+                parent.child_wall_ns += wall * stats.scale()
+            parent.peak_memory = max(parent.peak_memory, frame.peak_memory)
+
+    @property
+    def stats(self) -> dict[str, MethodStats]:
+        """Estimates aggregated over all call stacks of each method."""
+        aggregated: dict[str, MethodStats] = {}
+        for key, stack_stats in self.stacks.items():
+            names = key.split(";")
+            stats = aggregated.setdefault(names[-1], MethodStats())
+            stats.calls += stack_stats.calls
+            stats.sampled_calls += stack_stats.sampled_calls
+            # Recursive calls would be counted twice in inclusive times.
+            if names[-1] in names[:-1]:
+                continue
+            scale = stack_stats.scale()
+            stats.wall_ns += stack_stats.wall_ns * scale
+            stats.cpu_ns += stack_stats.cpu_ns * scale
+            stats.alloc_bytes += stack_stats.alloc_bytes * scale
+        return aggregated
+
+    def reset(self) -> None:
+        """Drop all recorded measurements."""
+        self.stacks = {}
+        self._root = StackStats()
+        self._stack = []
+        self._frames = []
+
+    def collapsed_stacks(self) -> str:
+        """Export estimated self wall times in the collapsed stack format.
+
+        Returns:
+            One "frame;frame;frame microseconds" line per unique stack.
+        """
+        return "".join(
+            f"{key} {int(stats.self_wall_ns * stats.scale()) // 1000}\n"
+            for key, stats in sorted(self.stacks.items())
+            )
+
+    def write_collapsed_stacks(self, path: str) -> None:
+        """Write the collapsed stacks into a file.
+
+        Args:
+            path: The output file path.
+        """
+        with open(path, "w", encoding="utf-8") as out_file:
+            out_file.write(self.collapsed_stacks())
+
+    def summary(self) -> str:
+        """Format the estimated measurements as a table.
+
+        Returns:
+            Table sorted by the inclusive wall time.
+        """
+        lines = [
+            f"Measured every {self.sample_every}. call of each call stack, "
+            "times and allocations are scaled to all calls.",
+            f"{'method':<28} {'calls':>8} {'sampled':>8} {'wall ms':>10} "
+            f"{'cpu ms':>10} {'us/call':>9} {'alloc KiB':>10}"
+            ]
+        ordered = sorted(
+            self.stats.items(),
+            key=lambda item: item[1].wall_ns,
+            reverse=True
+            )
+        for name, stats in ordered:
+            per_call = stats.wall_ns / stats.calls / 1000\
+                if stats.calls else 0
+            lines.append(
+                f"{name:<28} {stats.calls:>8} {stats.sampled_calls:>8} "
+                f"{stats.wall_ns / 1e6:>10.3f} {stats.cpu_ns / 1e6:>10.3f} "
+                f"{per_call:>9.2f} {stats.alloc_bytes / 1024:>10.1f}"
+                )
+        return "\n".join(lines)
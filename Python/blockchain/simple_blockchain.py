@@ -1,10 +1,14 @@
 """Basic example of blockchain with transactions between two users."""
+import contextlib
 import hashlib
 import json
 import sys
+import time
 import typing
 import random
 
+import blockchain.block_sizing as my_sizing
+import blockchain.profiling as my_prof
 import blockchain.structures as my_struct
 
 
@@ -15,15 +19,20 @@ class SimpleBlockchain(object):
             self,
             seed: int = 0,
             state: dict[str, int] = {"Alice": 50, "Bob": 50},
-            chain: list[my_struct.Block] = []
+            chain: list[my_struct.Block] = [],
+            profiler: typing.Optional[my_prof.Profiler] = None
             ) -> None:
         """Create a new blockchain.
         
         Args:
             seed: The seed for the random generator.
             state: the initial state.
+            profiler: Optional profiler to record the calls of this instance.
         """
         random.seed(seed)
+        self.profiler: typing.Optional[my_prof.Profiler] = profiler
+        if profiler is not None:
+            profiler.instrument(self)
         self.seed: int = seed
         self.state: dict[str, int] = state
         self.chain: list[my_struct.Block] = chain if chain\
@@ -31,6 +40,19 @@ class SimpleBlockchain(object):
         self.chain_bcp = []
         self.state_bcp = {}
 
+    def phase(self, name: str) -> typing.ContextManager:
+        """Mark a part of a method for the profiler.
+
+        Args:
+            name: The name of the phase.
+        Returns:
+            Context manager recording the enclosed code, a no-op without
+            a profiler.
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.phase(name)
+
     def _make_genesis_block(self) -> my_struct.Block:
         """Create an initial state of the blockchain.
 
@@ -41,7 +63,7 @@ class SimpleBlockchain(object):
             blockNumber=0,
             parentHash=None,
             transactionsCount=1,
-            transactions=[self.state]
+            transactions=[dict(self.state)]
         )
         return my_struct.Block(
             hash=self.hash_msg(gen_block_contents),
@@ -155,13 +177,19 @@ class SimpleBlockchain(object):
     def process_transactions_buffer(
             self,
             transactions_buffer: list[dict[str, int]],
-            max_block_size: int = 5
+            max_block_size: int = 5,
+            block_sizer: typing.Optional[my_sizing.AdaptiveBlockSizer] = None,
+            pending_transactions: int = 0
             ) -> tuple:
         """Process the transaction buffer and extend the blockchain.
         
         Args:
             transactions_buffer: List of transactions.
             max_block_size: Partitioning into blocks.
+            block_sizer: Optional policy choosing the size of every block,
+                overrides max_block_size.
+            pending_transactions: Transactions waiting outside of the buffer,
+                counted into the queue depth seen by block_sizer.
         Returns:
             Tuple with lists of accepted[0] and rejected[1] transactions.
         """
@@ -169,25 +197,42 @@ class SimpleBlockchain(object):
         rejects: int = 0
         while len(transactions_buffer) > 0:
             transactions_list: list[dict[str, int]] = []
-            while (len(transactions_buffer) > 0) and\
-                (len(transactions_list) < max_block_size):
-                transaction = transactions_buffer.pop()
-                if self.is_valid_transaction(transaction):
-                    transactions_list.append(transaction)
-                    self.update_state(transaction)
-                    accepted += 1
-                else:
-                    print("Transaction ignored.")
-                    rejects += 1
-                    sys.stdout.flush()
-                    continue
-            self.chain.append(
-                self.make_block(transactions_list)
-            )
-            print(
-                f"Processed: {transactions_list}\n"
-                f" into block {self.chain[-1].blockContents.blockNumber}")
-        print(f"Current blockchain size is now {len(self.chain)}")
+            examined: int = 0
+            if block_sizer is not None:
+                max_block_size = block_sizer.next_block_size(
+                    len(transactions_buffer) + pending_transactions)
+            block_started = time.perf_counter_ns()
+            with self.phase("validate"):
+                while (len(transactions_buffer) > 0) and\
+                    (len(transactions_list) < max_block_size):
+                    transaction = transactions_buffer.pop()
+                    examined += 1
+                    if self.is_valid_transaction(transaction):
+                        transactions_list.append(transaction)
+                        self.update_state(transaction)
+                        accepted += 1
+                    else:
+                        print("Transaction ignored.")
+                        rejects += 1
+                        sys.stdout.flush()
+                        continue
+            seal_started = time.perf_counter_ns()
+            with self.phase("seal"):
+                self.chain.append(
+                    self.make_block(transactions_list)
+                )
+            if block_sizer is not None:
+                block_sizer.record_block(
+                    examined,
+                    seal_started - block_started,
+                    time.perf_counter_ns() - seal_started
+                    )
+            with self.phase("report"):
+                print(
+                    f"Processed: {transactions_list}\n"
+                    f" into block {self.chain[-1].blockContents.blockNumber}")
+        with self.phase("report"):
+            print(f"Current blockchain size is now {len(self.chain)}")
         return (accepted, rejects)
 
     def check_block_hash(self, block: my_struct.Block) -> None:
@@ -252,7 +297,8 @@ class SimpleBlockchain(object):
         Retruns:
             Current chain in a string with json formatting.
         """
-        return json.dumps(self.chain.__repr__())
+        with self.phase("serialize"):
+            return json.dumps(self.chain.__repr__())
 
     def load_exported_chain(self, chain_str: str) -> list[my_struct.Block]:
         """Load a chain from an exported string.
@@ -266,11 +312,22 @@ class SimpleBlockchain(object):
         """
         # This is rather hacky implementation due to time contraints.
         loaded = json.loads(json.loads(chain_str))
-        return [
-            my_struct.Block(
-            hash=blc["hash"],
-            blockContents=my_struct.BlockContents(*blc["blockContents"])
-            ) for blc in loaded]
+        return [self.load_block(blc) for blc in loaded]
+
+    def load_block(self, block_dict: dict) -> my_struct.Block:
+        """Rebuild a block from its decoded json representation.
+
+        Args:
+            block_dict: Dict with the hash and the block contents list.
+        Returns:
+            A block candidate.
+        Raises:
+            KeyError: If the hash or block contents are missing.
+        """
+        return my_struct.Block(
+            hash=block_dict["hash"],
+            blockContents=my_struct.BlockContents(*block_dict["blockContents"])
+            )
 
     def import_chain(
             self,
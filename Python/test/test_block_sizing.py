@@ -0,0 +1,68 @@
+"""File containing unittests of AdaptiveBlockSizer."""
+import unittest
+
+import blockchain.block_sizing as sizing
+
+
+class AdaptiveBlockSizerTest(unittest.TestCase):
+    """Tests of AdaptiveBlockSizer policy."""
+
+    def test_next_block_size_grows_with_backlog(self):
+        """Test that deep queue doubles the block size."""
+        sizer = sizing.AdaptiveBlockSizer(initial_block_size=5)
+
+        self.assertEqual(sizer.next_block_size(100), 10)
+        self.assertEqual(sizer.decisions[-1].reason, "queue backlog")
+
+    def test_next_block_size_shrinks_when_draining(self):
+        """Test that shallow queue shrinks the block size."""
+        sizer = sizing.AdaptiveBlockSizer(initial_block_size=8)
+
+        self.assertEqual(sizer.next_block_size(2), 4)
+        self.assertEqual(sizer.decisions[-1].reason, "queue draining")
+
+    def test_next_block_size_latency_cap(self):
+        """Test that measured costs cap the size by the latency target."""
+        sizer = sizing.AdaptiveBlockSizer(
+            initial_block_size=64,
+            target_block_latency=0.001
+            )
+        # 100 us fixed and 100 us per transaction fit 9 transactions in 1 ms.
+        sizer.record_block(10, 1_000_000, 100_000)
+
+        self.assertEqual(sizer.next_block_size(1000), 9)
+        self.assertEqual(sizer.decisions[-1].reason, "latency target")
+
+    def test_next_block_size_throughput_floor(self):
+        """Test that measured costs raise the size to meet throughput."""
+        sizer = sizing.AdaptiveBlockSizer(
+            initial_block_size=1,
+            target_block_latency=None,
+            target_throughput=5000
+            )
+        # 1 ms fixed and 100 us per transaction need 10 transactions a block.
+        sizer.record_block(1, 100_000, 1_000_000)
+
+        self.assertEqual(sizer.next_block_size(1), 10)
+        self.assertEqual(sizer.decisions[-1].reason, "throughput target")
+
+    def test_next_block_size_bounds(self):
+        """Test that the size stays within the configured bounds."""
+        sizer = sizing.AdaptiveBlockSizer(
+            initial_block_size=4,
+            max_block_size=6
+            )
+
+        self.assertEqual(sizer.next_block_size(1000), 6)
+
+    def test_seal_deadline(self):
+        """Test the block age deadline measured from the oldest arrival."""
+        sizer = sizing.AdaptiveBlockSizer(max_block_age=0.5)
+
+        self.assertEqual(sizer.seal_deadline(10.0), 10.5)
+        self.assertIsNone(sizing.AdaptiveBlockSizer().seal_deadline(0))
+
+    def test_invalid_bounds(self):
+        """Test that inconsistent bounds are rejected."""
+        with self.assertRaises(ValueError):
+            sizing.AdaptiveBlockSizer(min_block_size=5, max_block_size=2)
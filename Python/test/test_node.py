@@ -0,0 +1,323 @@
+"""File containing unittests of StreamingNode."""
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import blockchain.block_sizing as sizing
+import blockchain.node as node
+
+
+class StreamingNodeTest(unittest.TestCase):
+    """Tests of StreamingNode processing and persistence."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "transactions.jsonl")
+        self.data_dir = os.path.join(self.tmp_dir.name, "data")
+        with open(self.source, "w", encoding="utf-8") as source_file:
+            for _ in range(12):
+                source_file.write(json.dumps({"Alice": -1, "Bob": 1}) + "\n")
+            source_file.write("not json\n")
+            source_file.write(json.dumps({"Alice": -100, "Bob": 100}) + "\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_processes_stream(self):
+        """Test that the whole stream is processed and persisted."""
+        tested_node = node.StreamingNode(
+            self.source,
+            self.data_dir,
+            batch_size=5,
+            batch_timeout=0.1
+            )
+
+        accepted, rejects = tested_node.run()
+
+        self.assertEqual(accepted, 12)
+        self.assertEqual(rejects, 1)
+        self.assertEqual(tested_node.blockchain.state, {"Alice": 38, "Bob": 62})
+        with open(tested_node.chain_path, encoding="utf-8") as chain_file:
+            self.assertEqual(
+                len(chain_file.readlines()),
+                len(tested_node.blockchain.chain)
+                )
+        with open(tested_node.state_path, encoding="utf-8") as state_file:
+            snapshot = json.load(state_file)
+        self.assertEqual(snapshot["state"], {"Alice": 38, "Bob": 62})
+
+    def test_persist_appends_only_new_blocks(self):
+        """Test that persisting twice doesn't duplicate blocks."""
+        tested_node = node.StreamingNode(self.source, self.data_dir)
+        tested_node.persist()
+        tested_node.persist()
+
+        with open(tested_node.chain_path, encoding="utf-8") as chain_file:
+            self.assertEqual(len(chain_file.readlines()), 1)
+
+    def test_restore(self):
+        """Test that a restarted node continues from the persisted chain."""
+        first_node = node.StreamingNode(
+            self.source,
+            self.data_dir,
+            batch_timeout=0.1
+            )
+        first_node.run()
+
+        second_node = node.StreamingNode(self.source, self.data_dir)
+
+        self.assertTrue(second_node.restore())
+        self.assertEqual(second_node.blockchain.chain, first_node.blockchain.chain)
+        self.assertEqual(second_node.blockchain.state, first_node.blockchain.state)
+
+    def test_restore_nothing(self):
+        """Test that restore without persisted data does nothing."""
+        tested_node = node.StreamingNode(self.source, self.data_dir)
+
+        self.assertFalse(tested_node.restore())
+        self.assertEqual(len(tested_node.blockchain.chain), 1)
+
+    def _append_unsnapshotted_block(self, source):
+        """Log one more block without updating the snapshot."""
+        tested_node = node.StreamingNode(source, self.data_dir)
+        tested_node.restore()
+        tested_node.blockchain.process_transactions_buffer(
+            [{"Alice": -2, "Bob": 2}])
+        with open(tested_node.chain_path, "a", encoding="utf-8") as log:
+            log.write(f"{tested_node.blockchain.chain[-1]!r}\n")
+        return tested_node.blockchain.chain
+
+    def test_restart_skips_processed_input(self):
+        """Test that a restarted node reads only the unprocessed input."""
+        first_node = node.StreamingNode(
+            self.source,
+            self.data_dir,
+            batch_timeout=0.1
+            )
+        first_node.run()
+
+        second_node = node.StreamingNode(self.source, self.data_dir)
+        accepted, rejects = second_node.run()
+
+        self.assertEqual((accepted, rejects), (0, 0))
+        self.assertEqual(second_node.blockchain.state, {"Alice": 38, "Bob": 62})
+        with open(self.source, "a", encoding="utf-8") as source_file:
+            source_file.write(json.dumps({"Alice": -1, "Bob": 1}) + "\n")
+
+        third_node = node.StreamingNode(self.source, self.data_dir)
+        accepted, rejects = third_node.run()
+
+        self.assertEqual((accepted, rejects), (1, 0))
+        self.assertEqual(third_node.blockchain.state, {"Alice": 37, "Bob": 63})
+        with open(third_node.chain_path, encoding="utf-8") as chain_file:
+            self.assertEqual(
+                len(chain_file.readlines()),
+                len(third_node.blockchain.chain)
+                )
+
+    def test_persist_without_restore(self):
+        """Test that an existing chain log isn't extended blindly."""
+        node.StreamingNode(self.source, self.data_dir).run()
+
+        with self.assertRaises(ValueError):
+            node.StreamingNode(self.source, self.data_dir).persist()
+
+    def test_restore_torn_log(self):
+        """Test that a partially appended last line is cut off."""
+        first_node = node.StreamingNode(self.source, self.data_dir)
+        first_node.run()
+        with open(first_node.chain_path, "a", encoding="utf-8") as log:
+            log.write('{"hash": "ab')
+
+        second_node = node.StreamingNode(self.source, self.data_dir)
+
+        self.assertTrue(second_node.restore())
+        self.assertEqual(second_node.blockchain.chain, first_node.blockchain.chain)
+        with open(second_node.chain_path, encoding="utf-8") as chain_file:
+            lines = chain_file.readlines()
+        self.assertEqual(len(lines), len(first_node.blockchain.chain))
+        self.assertTrue(lines[-1].endswith("\n"))
+
+    def test_restore_corrupted_log(self):
+        """Test that corruption before the last line is reported."""
+        tested_node = node.StreamingNode(self.source, self.data_dir)
+        tested_node.run()
+        with open(tested_node.chain_path, encoding="utf-8") as chain_file:
+            lines = chain_file.readlines()
+        lines.insert(1, "garbage\n")
+        with open(tested_node.chain_path, "w", encoding="utf-8") as chain_file:
+            chain_file.writelines(lines)
+
+        with self.assertRaises(ValueError):
+            node.StreamingNode(self.source, self.data_dir).restore()
+
+    def test_restore_snapshot_mismatch(self):
+        """Test that a snapshot of a different chain is rejected."""
+        tested_node = node.StreamingNode(self.source, self.data_dir)
+        tested_node.run()
+        with open(tested_node.state_path, encoding="utf-8") as state_file:
+            snapshot = json.load(state_file)
+        snapshot["hash"] = "bla"
+        with open(tested_node.state_path, "w", encoding="utf-8") as state_file:
+            json.dump(snapshot, state_file)
+
+        with self.assertRaises(ValueError):
+            node.StreamingNode(self.source, self.data_dir).restore()
+
+    def test_restore_file_source_drops_unsnapshotted_blocks(self):
+        """Test that blocks after the snapshot are re-read from the file."""
+        first_node = node.StreamingNode(self.source, self.data_dir)
+        first_node.run()
+        self._append_unsnapshotted_block(self.source)
+
+        second_node = node.StreamingNode(self.source, self.data_dir)
+
+        self.assertTrue(second_node.restore())
+        self.assertEqual(second_node.blockchain.chain, first_node.blockchain.chain)
+        self.assertEqual(second_node.blockchain.state, {"Alice": 38, "Bob": 62})
+
+    def test_restore_socket_source_keeps_unsnapshotted_blocks(self):
+        """Test that blocks after the snapshot are validated and kept."""
+        node.StreamingNode(self.source, self.data_dir).run()
+        socket_source = "unix:" + os.path.join(self.tmp_dir.name, "sock")
+        expected_chain = self._append_unsnapshotted_block(socket_source)
+
+        tested_node = node.StreamingNode(socket_source, self.data_dir)
+
+        self.assertTrue(tested_node.restore())
+        self.assertEqual(tested_node.blockchain.chain, expected_chain)
+        self.assertEqual(tested_node.blockchain.state, {"Alice": 36, "Bob": 64})
+
+    def test_stop_drains_queue(self):
+        """Test that queued transactions are processed after a stop."""
+        socket_source = "unix:" + os.path.join(self.tmp_dir.name, "sock")
+        tested_node = node.StreamingNode(socket_source, self.data_dir)
+        for _ in range(7):
+            tested_node.transactions.put(
+                ({"Alice": -1, "Bob": 1}, None, time.monotonic()))
+        tested_node.stop()
+
+        accepted, rejects = tested_node.run()
+
+        self.assertEqual((accepted, rejects), (7, 0))
+        restored_node = node.StreamingNode(socket_source, self.data_dir)
+        restored_node.restore()
+        self.assertEqual(restored_node.blockchain.state, {"Alice": 43, "Bob": 57})
+
+    def _start_socket_node(self):
+        """Run a node fed by a unix socket on a background thread."""
+        socket_path = os.path.join(self.tmp_dir.name, "sock")
+        tested_node = node.StreamingNode(
+            "unix:" + socket_path,
+            self.data_dir,
+            batch_timeout=0.05,
+            persist_interval=60
+            )
+        runner = threading.Thread(target=tested_node.run)
+        runner.start()
+        self.addCleanup(runner.join, 5)
+        self.addCleanup(tested_node.stop)
+        return tested_node, runner, socket_path
+
+    def _connect(self, socket_path):
+        """Connect to the node, waiting until it listens."""
+        deadline = time.monotonic() + 5
+        while True:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                client.connect(socket_path)
+                return client
+            except (FileNotFoundError, ConnectionRefusedError):
+                client.close()
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+    def _wait_for(self, condition):
+        """Wait until the condition holds."""
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_socket_source_stop(self):
+        """Test that a socket fed node persists everything when stopped."""
+        tested_node, runner, socket_path = self._start_socket_node()
+        with self._connect(socket_path) as client:
+            for _ in range(20):
+                client.sendall(b'{"Alice": -1, "Bob": 1}\n')
+        self._wait_for(lambda: tested_node.accepted >= 20)
+        tested_node.stop()
+        runner.join(5)
+
+        self.assertFalse(runner.is_alive())
+        restored_node = node.StreamingNode("-", self.data_dir)
+        self.assertTrue(restored_node.restore())
+        self.assertEqual(restored_node.blockchain.chain, tested_node.blockchain.chain)
+        self.assertEqual(restored_node.blockchain.state, {"Alice": 30, "Bob": 70})
+
+    def test_socket_source_bad_client(self):
+        """Test that undecodable input only skips the offending line."""
+        tested_node, runner, socket_path = self._start_socket_node()
+        with self._connect(socket_path) as client:
+            client.sendall(b'{"Alice": -1, "Bob": 1}\n\xff\xfe\n')
+        with self._connect(socket_path) as client:
+            client.sendall(b'{"Alice": -1, "Bob": 1}\n')
+
+        self._wait_for(lambda: tested_node.accepted >= 2)
+        self.assertTrue(runner.is_alive())
+
+    def test_socket_source_idle_client(self):
+        """Test that an idle connection doesn't block other clients."""
+        tested_node, _, socket_path = self._start_socket_node()
+        with self._connect(socket_path):
+            with self._connect(socket_path) as client:
+                client.sendall(b'{"Alice": -1, "Bob": 1}\n')
+            self._wait_for(lambda: tested_node.accepted >= 1)
+
+    def test_socket_source_stop_counts_dropped(self):
+        """Test that read lines are drained and incomplete ones counted."""
+        tested_node, runner, socket_path = self._start_socket_node()
+        with self._connect(socket_path) as client:
+            client.sendall(b'{"Alice": -1, "Bob": 1}\n{"Alice": -1')
+            self._wait_for(lambda: tested_node.accepted >= 1)
+            time.sleep(0.3)
+            tested_node.stop()
+            runner.join(5)
+
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(tested_node.accepted, 1)
+        self.assertEqual(tested_node.dropped, 1)
+
+    def test_run_reader_failure(self):
+        """Test that a source which can't be read fails the run."""
+        tested_node = node.StreamingNode(
+            os.path.join(self.tmp_dir.name, "missing.jsonl"),
+            self.data_dir
+            )
+
+        with self.assertRaises(RuntimeError):
+            tested_node.run()
+
+    def test_next_batch_seals_on_block_age(self):
+        """Test that a batch is cut once its oldest transaction is too old."""
+        tested_node = node.StreamingNode(
+            self.source,
+            self.data_dir,
+            batch_timeout=60,
+            block_sizer=sizing.AdaptiveBlockSizer(max_block_age=0.05)
+            )
+        tested_node.transactions.put(
+            ({"Alice": -1, "Bob": 1}, None, time.monotonic() - 1))
+        tested_node.transactions.put(
+            ({"Alice": -1, "Bob": 1}, None, time.monotonic()))
+
+        started = time.monotonic()
+        batch, finished = tested_node._next_batch()
+
+        self.assertEqual(len(batch), 2)
+        self.assertFalse(finished)
+        self.assertLess(time.monotonic() - started, 1)
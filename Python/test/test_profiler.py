@@ -0,0 +1,141 @@
+"""File containing unittests of Profiler."""
+import tracemalloc
+import unittest
+
+import blockchain.profiling as prof
+import blockchain.simple_blockchain as blc
+
+
+class ProfilerTest(unittest.TestCase):
+    """Tests of Profiler attached to SimpleBlockchain."""
+
+    def test_profiler_records_methods(self):
+        """Test that calls of the instrumented methods are counted."""
+        profiler = prof.Profiler()
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        test_buffer = tested_blc.make_transactions_buffer(5)
+        tested_blc.process_transactions_buffer(test_buffer)
+
+        self.assertEqual(profiler.stats["make_block"].calls, 1)
+        self.assertEqual(profiler.stats["is_valid_transaction"].calls, 5)
+        self.assertEqual(profiler.stats["hash_msg"].calls, 2)
+        self.assertIn(
+            "process_transactions_buffer;seal;make_block;hash_msg",
+            profiler.stacks
+            )
+
+    def test_profiler_collapsed_stacks_format(self):
+        """Test that every collapsed stack line ends with an integer."""
+        profiler = prof.Profiler()
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        tested_blc.make_transactions_buffer(3)
+
+        lines = profiler.collapsed_stacks().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, value = line.rsplit(" ", 1)
+            self.assertTrue(stack)
+            self.assertTrue(value.isdigit())
+
+    def test_profiler_sampling(self):
+        """Test that every call is counted and every n-th one measured."""
+        profiler = prof.Profiler(sample_every=2)
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        profiler.reset()
+        for _ in range(4):
+            tested_blc.hash_msg("bla")
+        tested_blc.export_chain()
+
+        self.assertEqual(profiler.stats["hash_msg"].calls, 4)
+        self.assertEqual(profiler.stats["hash_msg"].sampled_calls, 2)
+        self.assertEqual(profiler.stacks["hash_msg"].scale(), 2)
+        # Rarely called methods are measured no matter the call order.
+        self.assertEqual(profiler.stats["export_chain"].sampled_calls, 1)
+        self.assertIn("every 2. call", profiler.summary())
+
+    def test_profiler_sampling_per_stack(self):
+        """Test that each call stack is sampled and scaled on its own."""
+        profiler = prof.Profiler(sample_every=3)
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        for _ in range(6):
+            tested_blc.hash_msg("bla")
+
+        genesis = profiler.stacks["_make_genesis_block;hash_msg"]
+        self.assertEqual((genesis.calls, genesis.sampled_calls), (1, 1))
+        self.assertEqual(profiler.stacks["hash_msg"].calls, 6)
+        self.assertEqual(profiler.stacks["hash_msg"].sampled_calls, 2)
+        # The flamegraph subtree adds up to the inclusive time of the method.
+        subtree = sum(
+            stats.self_wall_ns * stats.scale()
+            for key, stats in profiler.stacks.items()
+            if key.startswith("_make_genesis_block")
+            )
+        self.assertAlmostEqual(
+            subtree,
+            profiler.stats["_make_genesis_block"].wall_ns,
+            delta=profiler.stats["_make_genesis_block"].wall_ns * 0.01 + 1)
+
+    def test_profiler_phase(self):
+        """Test that phases are recorded as nested frames."""
+        profiler = prof.Profiler(sample_every=1)
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        tested_blc.process_transactions_buffer(
+            tested_blc.make_transactions_buffer(5))
+        tested_blc.export_chain()
+
+        for key in (
+                "process_transactions_buffer;validate;is_valid_transaction",
+                "process_transactions_buffer;seal;make_block",
+                "process_transactions_buffer;report",
+                "export_chain;serialize"):
+            self.assertIn(key, profiler.stacks)
+
+    def test_profiler_cpu_time(self):
+        """Test that CPU time of a single thread doesn't exceed wall time."""
+        profiler = prof.Profiler(sample_every=1)
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        for _ in range(200):
+            tested_blc.is_valid_transaction({"Alice": -1, "Bob": 1})
+
+        stats = profiler.stats["is_valid_transaction"]
+        self.assertLessEqual(stats.cpu_ns, stats.wall_ns)
+
+    def test_profiler_allocations(self):
+        """Test that memory freed within a call is still attributed."""
+        profiler = prof.Profiler(sample_every=1, trace_allocations=True)
+        tested_blc = blc.SimpleBlockchain(
+            state={"Alice": 50, "Bob": 50},
+            profiler=profiler
+            )
+        profiler.reset()
+        msg = {f"key{i}": "x" * 60 for i in range(120)}
+        for _ in range(10):
+            tested_blc.hash_msg(msg)
+        profiler.stop()
+
+        # Every call serializes roughly 8 KB of json.
+        self.assertGreater(profiler.stats["hash_msg"].alloc_bytes, 10 * 8000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_profiler_invalid_sampling(self):
+        """Test that non positive sampling rate is rejected."""
+        with self.assertRaises(ValueError):
+            prof.Profiler(sample_every=0)
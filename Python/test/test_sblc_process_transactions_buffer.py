@@ -1,6 +1,7 @@
 """File containing unittests of SimpleBlockchain."""
 import unittest
 
+import blockchain.block_sizing as sizing
 import blockchain.simple_blockchain as blc
 
 
@@ -31,4 +32,40 @@ class SimpleBlockchainProcessTransactionsBufferTest(unittest.TestCase):
 
         self.assertEqual(accepted, 5)
         self.assertEqual(rejects, 1)
-        self.assertEqual(len(tested_blc.chain), 3)
\ No newline at end of file
+        self.assertEqual(len(tested_blc.chain), 3)
+
+    def test_process_transactions_buffer_block_sizer(self):
+        """Test that the block sizer decides the size of the blocks."""
+        tested_blc = blc.SimpleBlockchain(state={"Alice": 50, "Bob": 50})
+        test_buffer = tested_blc.make_transactions_buffer(30)
+        sizer = sizing.AdaptiveBlockSizer(
+            initial_block_size=5,
+            target_block_latency=None
+            )
+
+        accepted, rejects = tested_blc.process_transactions_buffer(
+            test_buffer,
+            block_sizer=sizer
+            )
+
+        self.assertEqual(accepted, 30)
+        self.assertEqual(rejects, 0)
+        # Block sizes 10, 20 drain the buffer.
+        self.assertEqual(len(tested_blc.chain), 3)
+        self.assertEqual(len(sizer.decisions), 2)
+        self.assertIsNotNone(sizer.fixed_cost_ns)
+
+    def test_process_transactions_buffer_pending_transactions(self):
+        """Test that the block sizer sees the transactions queued elsewhere."""
+        tested_blc = blc.SimpleBlockchain(state={"Alice": 50, "Bob": 50})
+        test_buffer = tested_blc.make_transactions_buffer(3)
+        sizer = sizing.AdaptiveBlockSizer(initial_block_size=5)
+
+        tested_blc.process_transactions_buffer(
+            test_buffer,
+            block_sizer=sizer,
+            pending_transactions=100
+            )
+
+        self.assertEqual(sizer.decisions[0].queueDepth, 103)
+        self.assertEqual(sizer.decisions[0].reason, "queue backlog")